@@ -14,9 +14,30 @@ import {
   createStorageError,
   createUploadNotFoundError,
   logError,
+  isVerboseLogging,
   PartialFailureHandler
 } from './error-handler.js';
-import { SecurityValidator } from './security.js';
+import { SecurityValidator, TAKEOUT_REQUIRED_FIELDS } from './security.js';
+
+// Rate limiter state (health checks, D1 config cache, analytics buffer and the
+// in-memory fallback store) lives for the isolate instead of a single request.
+const rateLimiters = new WeakMap();
+
+const utf8Decoder = new TextDecoder();
+
+/**
+ * Returns the isolate-wide RateLimiter for an environment, creating it on first use.
+ * @param {object} env - The environment variables and bindings.
+ * @returns {RateLimiter} The shared rate limiter instance.
+ */
+function getRateLimiter(env) {
+  let rateLimiter = rateLimiters.get(env);
+  if (!rateLimiter) {
+    rateLimiter = new RateLimiter(env);
+    rateLimiters.set(env, rateLimiter);
+  }
+  return rateLimiter;
+}
 
 /**
  * Main request handler for all API routes on Cloudflare Pages.
@@ -31,7 +52,7 @@ export async function onRequest(context) {
   const url = new URL(request.url);
   const pathname = url.pathname;
 
-  const rateLimiter = new RateLimiter(env);
+  const rateLimiter = getRateLimiter(env);
   const securityValidator = new SecurityValidator(env);
 
   const corsHeaders = {
@@ -61,7 +82,17 @@ export async function onRequest(context) {
     } else if (pathname === '/api/validate') {
       return handleValidate(request, env, secureHeaders, rateLimiter, securityValidator);
     } else if (pathname === '/api/convert') {
-      return handleConvert(request, env, secureHeaders, rateLimiter, securityValidator);
+      // The daily limit is checked before converting and recorded after, so a second
+      // conversion from the same client is rejected while one is still running.
+      try {
+        return await rateLimiter.withClientSlot(rateLimiter.getClientId(request), () =>
+          handleConvert(request, env, secureHeaders, rateLimiter, securityValidator));
+      } catch (error) {
+        if (error instanceof AppError && error.details?.rateLimited) {
+          return rateLimiter.createRateLimitResponse(error.details, secureHeaders);
+        }
+        throw error;
+      }
     } else if (pathname.startsWith('/api/download/')) {
       return handleDownload(request, env, corsHeaders);
     } else if (pathname === '/api/' || pathname === '/api') {
@@ -177,6 +208,7 @@ async function handleUpload(request, env, corsHeaders, rateLimiter, securityVali
 
     const uploadId = crypto.randomUUID();
     const fileData = [];
+    const pendingPuts = [];
 
     for (const file of files) {
       const sanitizedFilename = securityValidator.validateFilename(file.name);
@@ -184,19 +216,22 @@ async function handleUpload(request, env, corsHeaders, rateLimiter, securityVali
         throw createFileError('invalid_type', sanitizedFilename);
       }
 
-      const content = await file.text();
+      // Keep the raw bytes for R2 and decode once for validation, rather than
+      // reading text and having R2 re-encode it on put.
+      const bytes = await file.arrayBuffer();
+      const content = utf8Decoder.decode(bytes);
       try {
         const jsonData = securityValidator.validateFileContent(content, sanitizedFilename);
         securityValidator.validateGoogleTakeoutFormat(jsonData, sanitizedFilename);
-        fileData.push({ filename: sanitizedFilename, data: jsonData });
-
-        try {
-          await env.FILE_STORAGE.put(`uploads/${uploadId}/${sanitizedFilename}`, content, {
-            httpMetadata: { contentType: 'application/json' }
-          });
-        } catch (storageError) {
-          throw createStorageError('upload', `Failed to store ${sanitizedFilename}: ${storageError.message}`);
-        }
+        // Record the summary shown by /validate now, while the JSON is already parsed,
+        // so validation does not have to fetch and parse the file from R2 again.
+        fileData.push({
+          filename: sanitizedFilename,
+          size: file.size,
+          entry_count: jsonData.length,
+          date_range: getDateRange(jsonData)
+        });
+        pendingPuts.push([sanitizedFilename, bytes]);
       } catch (validationError) {
         if (validationError instanceof AppError) {
           throw validationError;
@@ -205,9 +240,20 @@ async function handleUpload(request, env, corsHeaders, rateLimiter, securityVali
       }
     }
 
+    // Every file has been validated; store them in R2 concurrently.
+    await Promise.all(pendingPuts.map(async ([sanitizedFilename, bytes]) => {
+      try {
+        await env.FILE_STORAGE.put(`uploads/${uploadId}/${sanitizedFilename}`, bytes, {
+          httpMetadata: { contentType: 'application/json' }
+        });
+      } catch (storageError) {
+        throw createStorageError('upload', `Failed to store ${sanitizedFilename}: ${storageError.message}`);
+      }
+    }));
+
     try {
       await env.RATE_LIMITS.put(`upload:${uploadId}`, JSON.stringify({
-        files: fileData.map(f => ({ filename: f.filename, size: JSON.stringify(f.data).length })),
+        files: fileData,
         timestamp: Date.now(),
         status: 'uploaded'
       }), { expirationTtl: 3600 });
@@ -269,6 +315,18 @@ async function handleValidate(request, env, corsHeaders) {
     const validationResults = [];
 
     for (const fileInfo of metadata.files) {
+      // Files uploaded with a stored summary already passed the stricter upload-time checks.
+      if (fileInfo.entry_count !== undefined) {
+        validationResults.push({
+          filename: fileInfo.filename,
+          is_valid: true,
+          entry_count: fileInfo.entry_count,
+          date_range: fileInfo.date_range,
+          size_kb: Math.round(fileInfo.size / 1024)
+        });
+        continue;
+      }
+
       try {
         const fileObj = await env.FILE_STORAGE.get(`uploads/${upload_id}/${fileInfo.filename}`);
         if (!fileObj) {
@@ -276,8 +334,7 @@ async function handleValidate(request, env, corsHeaders) {
           continue;
         }
 
-        const content = await fileObj.text();
-        const jsonData = JSON.parse(content);
+        const jsonData = await fileObj.json();
         const isValidFormat = validateGoogleTakeoutFormat(jsonData);
 
         if (isValidFormat) {
@@ -344,8 +401,10 @@ function validateGoogleTakeoutFormat(data) {
     return false;
   }
   const firstEntry = data[0];
-  const requiredFields = ['logId', 'weight', 'date', 'time'];
-  return requiredFields.every(field => field in firstEntry);
+  for (const field of TAKEOUT_REQUIRED_FIELDS) {
+    if (!(field in firstEntry)) return false;
+  }
+  return true;
 }
 
 /**
@@ -356,27 +415,28 @@ function validateGoogleTakeoutFormat(data) {
 function getDateRange(data) {
   if (!data || data.length === 0) return 'No data';
   try {
-    const dates = data.map(entry => {
-      if (entry.date) {
-        const parts = entry.date.split('/');
-        const year = parts[2].length === 2 ? Number('20' + parts[2]) : Number(parts[2]);
-        const month = Number(parts[0]);
-        const day = Number(parts[1]);
-        return new Date(year, month - 1, day);
-      }
-      return null;
-    }).filter(date => date !== null);
+    let minTime = Infinity;
+    let maxTime = -Infinity;
+    for (const entry of data) {
+      if (!entry.date) continue;
+      const parts = entry.date.split('/');
+      const year = parts[2].length === 2 ? Number('20' + parts[2]) : Number(parts[2]);
+      const month = Number(parts[0]);
+      const day = Number(parts[1]);
+      const time = new Date(year, month - 1, day).getTime();
+      if (Number.isNaN(time)) return 'Unable to determine date range';
+      if (time < minTime) minTime = time;
+      if (time > maxTime) maxTime = time;
+    }
 
-    if (dates.length === 0) return 'Invalid dates';
+    if (minTime === Infinity) return 'Invalid dates';
 
-    const minDate = new Date(Math.min(...dates));
-    const maxDate = new Date(Math.max(...dates));
-    const formatDate = (date) => date.toISOString().split('T')[0];
+    const formatDate = (time) => new Date(time).toISOString().split('T')[0];
 
-    if (minDate.getTime() === maxDate.getTime()) {
-      return formatDate(minDate);
+    if (minTime === maxTime) {
+      return formatDate(minTime);
     } else {
-      return `${formatDate(minDate)} to ${formatDate(maxDate)}`;
+      return `${formatDate(minTime)} to ${formatDate(maxTime)}`;
     }
   } catch (error) {
     return 'Unable to determine date range';
@@ -449,47 +509,79 @@ async function handleConvert(request, env, corsHeaders, rateLimiter) {
 
     const { convertFitbitToGarmin } = await import('./fit-converter.js');
 
-    for (const fileInfo of metadata.files) {
-      try {
-        const fileObj = await env.FILE_STORAGE.get(`uploads/${upload_id}/${fileInfo.filename}`);
-        if (!fileObj) {
-          throw createStorageError('retrieve', `File not found: ${fileInfo.filename}`);
-        }
-
-        const content = await fileObj.text();
-        const jsonData = JSON.parse(content);
-        const fileEntries = jsonData.length;
+    // Files are independent, so fetch and convert them concurrently.
+    const conversions = await Promise.allSettled(metadata.files.map(async (fileInfo) => {
+      const fileObj = await env.FILE_STORAGE.get(`uploads/${upload_id}/${fileInfo.filename}`);
+      if (!fileObj) {
+        throw createStorageError('retrieve', `File not found: ${fileInfo.filename}`);
+      }
 
-        const conversionResults = await convertFitbitToGarmin([[fileInfo.filename, jsonData]]);
-        const [outputFilename, fitData] = conversionResults[0];
+      // Parse straight from the R2 body instead of materializing an intermediate string here.
+      // The parsed array is not bound to a local, so it is unreachable once conversion returns
+      // and is not held while the converted files are stored.
+      const conversionResults = await convertFitbitToGarmin(
+        [[fileInfo.filename, await fileObj.json()]],
+        { verbose: isVerboseLogging(env) }
+      );
+      const [outputFilename, fitData, , entries] = conversionResults[0];
+      return { outputFilename, fitData, entries };
+    }));
+
+    // Uploads from the same ISO week convert to the same name. Number the repeats in
+    // upload order so every file gets its own R2 key and download URL.
+    const outputFilenames = new Set();
+    for (const conversion of conversions) {
+      if (conversion.status !== 'fulfilled') continue;
+      const baseName = conversion.value.outputFilename;
+      let outputFilename = baseName;
+      for (let copy = 2; outputFilenames.has(outputFilename); copy++) {
+        outputFilename = baseName.replace(/\.fit$/, ` (${copy}).fit`);
+      }
+      outputFilenames.add(outputFilename);
+      conversion.value.outputFilename = outputFilename;
+    }
 
-        try {
-          await env.FILE_STORAGE.put(`converted/${conversionId}/${outputFilename}`, fitData, {
-            httpMetadata: { contentType: 'application/octet-stream' }
-          });
-        } catch (storageError) {
-          throw createStorageError('store_converted', `Failed to store ${outputFilename}: ${storageError.message}`);
-        }
+    // Store concurrently and record the outcomes afterwards in upload order.
+    const outcomes = await Promise.allSettled(conversions.map(async (conversion, index) => {
+      if (conversion.status === 'rejected') {
+        throw conversion.reason;
+      }
+      const { outputFilename, fitData, entries } = conversion.value;
 
-        totalEntries += fileEntries;
-        failureHandler.addSuccess(fileInfo.filename, {
-          original_filename: fileInfo.filename,
-          converted_filename: outputFilename,
-          entries: fileEntries
+      try {
+        await env.FILE_STORAGE.put(`converted/${conversionId}/${outputFilename}`, fitData, {
+          httpMetadata: { contentType: 'application/octet-stream' }
         });
+      } catch (storageError) {
+        throw createStorageError('store_converted', `Failed to store ${outputFilename}: ${storageError.message}`);
+      }
 
-      } catch (fileError) {
-        console.error(`Error processing file ${fileInfo.filename}:`, fileError);
-        let conversionError;
-        if (fileError instanceof AppError) {
-          conversionError = fileError;
-        } else {
-          const msg = (fileError && fileError.message) ? String(fileError.message) : 'Unknown error';
-          conversionError = createConversionError(msg);
-        }
-        failureHandler.addFailure(fileInfo.filename, conversionError);
+      return {
+        original_filename: metadata.files[index].filename,
+        converted_filename: outputFilename,
+        entries
+      };
+    }));
+
+    outcomes.forEach((outcome, index) => {
+      const fileInfo = metadata.files[index];
+      if (outcome.status === 'fulfilled') {
+        totalEntries += outcome.value.entries;
+        failureHandler.addSuccess(fileInfo.filename, outcome.value);
+        return;
       }
-    }
+
+      const fileError = outcome.reason;
+      console.error(`Error processing file ${fileInfo.filename}:`, fileError);
+      let conversionError;
+      if (fileError instanceof AppError) {
+        conversionError = fileError;
+      } else {
+        const msg = (fileError && fileError.message) ? String(fileError.message) : 'Unknown error';
+        conversionError = createConversionError(msg);
+      }
+      failureHandler.addFailure(fileInfo.filename, conversionError);
+    });
 
     if (!failureHandler.hasSuccesses()) {
       throw new AppError(ERROR_CODES.CONVERSION_FAILED, 'All files failed to convert', 500);
@@ -501,7 +593,7 @@ async function handleConvert(request, env, corsHeaders, rateLimiter) {
     try {
       await env.RATE_LIMITS.put(`conversion:${conversionId}`, JSON.stringify({
         upload_id: upload_id,
-        files: convertedFiles,
+        files: Object.fromEntries(successfulResults.map(r => [r.converted_filename, r.entries])),
         timestamp: Date.now(),
         total_entries: totalEntries,
         status: failureHandler.hasFailures() ? 'partial_success' : 'completed',
@@ -591,7 +683,11 @@ async function handleDownload(request, env, corsHeaders) {
 
     const metadata = JSON.parse(conversionMetadata);
 
-    if (!metadata.files.includes(filename)) {
+    // Files are keyed by name; arrays are from metadata written before that change.
+    const isKnownFile = Array.isArray(metadata.files)
+      ? metadata.files.includes(filename)
+      : Object.hasOwn(metadata.files, filename);
+    if (!isKnownFile) {
       return new Response(JSON.stringify({ error: "File not found in conversion" }), {
         status: 404,
         headers: { ...corsHeaders, 'Content-Type': 'application/json' },
@@ -7,6 +7,24 @@
 
 import { AppError } from './error-handler.js';
 
+/**
+ * @constant {number} CONFIG_TTL_MS
+ * @description How long a successfully loaded `rate_limit_config` is reused before it is re-read.
+ */
+const CONFIG_TTL_MS = 5 * 60 * 1000;
+
+/**
+ * @constant {object} DEFAULT_CONFIGS
+ * @description Limits used while `rate_limit_config` cannot be read.
+ */
+const DEFAULT_CONFIGS = {
+  uploads: { max: 20, window: 300, burst: 0, enabled: true },
+  conversions: { max: 10, window: 3600, burst: 0, enabled: true },
+  validations: { max: 30, window: 300, burst: 0, enabled: true },
+  downloads: { max: 50, window: 300, burst: 0, enabled: true },
+  suspicious: { max: 100, window: 60, burst: 0, enabled: true }
+};
+
 /**
  * A rate limiter class that uses Cloudflare D1 for state management.
  */
@@ -21,15 +39,17 @@ export class D1RateLimiter {
     this.db = env.RATE_LIMITS_DB;
     this.kv = env.RATE_LIMITS;
     this.configs = new Map(); // In-memory config cache
+    this.configLoadedAt = 0; // When `configs` was last loaded from D1; 0 if never
   }
 
   /**
    * Loads rate limiting configurations from the D1 database into an in-memory cache.
-   * If loading fails, it falls back to a set of default configurations.
+   * A successful load is reused for CONFIG_TTL_MS so config edits are picked up. If loading
+   * fails, the last good configs (or the defaults) are used and the load is retried next call.
    * @returns {Promise<void>}
    */
   async loadConfig() {
-    if (this.configs.size > 0) return; // Already loaded
+    if (this.configs.size > 0 && Date.now() - this.configLoadedAt < CONFIG_TTL_MS) return;
 
     try {
       const { results } = await this.db.prepare(`
@@ -39,22 +59,24 @@ export class D1RateLimiter {
         ORDER BY priority DESC
       `).all();
 
+      const configs = new Map();
       for (const config of results) {
-        this.configs.set(config.endpoint, {
+        configs.set(config.endpoint, {
           max: config.max_requests,
           window: config.window_size,
           burst: config.burst_allowance || 0,
           enabled: config.enabled === 1
         });
       }
+      this.configs = configs;
+      this.configLoadedAt = Date.now();
     } catch (error) {
       console.error('Failed to load rate limit config:', error);
-      // Fallback to default configs
-      this.configs.set('uploads', { max: 20, window: 300, burst: 0, enabled: true });
-      this.configs.set('conversions', { max: 10, window: 3600, burst: 0, enabled: true });
-      this.configs.set('validations', { max: 30, window: 300, burst: 0, enabled: true });
-      this.configs.set('downloads', { max: 50, window: 300, burst: 0, enabled: true });
-      this.configs.set('suspicious', { max: 100, window: 60, burst: 0, enabled: true });
+      // Keep the last good configs if there are any. The fallback is never marked as loaded,
+      // so the next call retries D1 instead of keeping the defaults for the isolate's lifetime.
+      if (this.configLoadedAt === 0) {
+        this.configs = new Map(Object.entries(DEFAULT_CONFIGS));
+      }
     }
   }
 
@@ -113,6 +135,7 @@ export class D1RateLimiter {
 
       // Atomically insert or update the request count for the current time bucket.
       const windowBucket = Math.floor(now / 60) * 60; // 1-minute buckets
+      const metadataJson = JSON.stringify(metadata);
       await this.db.prepare(`
         INSERT INTO rate_limits
         (client_id, endpoint, timestamp, window_start, request_count, metadata, updated_at)
@@ -123,7 +146,7 @@ export class D1RateLimiter {
           timestamp = ?,
           metadata = ?,
           updated_at = datetime('now')
-      `).bind(clientId, endpoint, now, windowBucket, JSON.stringify(metadata), now, JSON.stringify(metadata)).run();
+      `).bind(clientId, endpoint, now, windowBucket, metadataJson, now, metadataJson).run();
 
       return {
         rateLimited: false,
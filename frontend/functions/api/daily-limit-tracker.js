@@ -24,8 +24,15 @@ export class DailyLimitTracker {
    * @returns {string} The current UTC date string.
    */
   getCurrentDate() {
-    const now = new Date();
-    return now.toISOString().split('T')[0];
+    return new Date().toISOString().slice(0, 10);
+  }
+
+  /**
+   * Gets the time of the next daily reset (midnight UTC) using integer arithmetic.
+   * @returns {number} The reset time as a Unix timestamp in seconds.
+   */
+  getResetTime() {
+    return (Math.floor(Date.now() / 86400000) + 1) * 86400;
   }
 
   /**
@@ -41,10 +48,7 @@ export class DailyLimitTracker {
         `SELECT files_converted, conversions, updated_at FROM daily_usage WHERE client_id = ? AND date = ?`
       ).bind(clientId, today).all();
 
-      const tomorrow = new Date();
-      tomorrow.setUTCDate(tomorrow.getUTCDate() + 1);
-      tomorrow.setUTCHours(0, 0, 0, 0);
-      const resetTime = Math.floor(tomorrow.getTime() / 1000);
+      const resetTime = this.getResetTime();
 
       if (results.length === 0) {
         return { filesConverted: 0, conversions: 0, filesRemaining: this.dailyLimit, resetTime, date: today };
@@ -60,12 +64,9 @@ export class DailyLimitTracker {
       };
     } catch (error) {
       console.error('Failed to get daily usage:', error);
-      const tomorrow = new Date();
-      tomorrow.setUTCDate(tomorrow.getUTCDate() + 1);
-      tomorrow.setUTCHours(0, 0, 0, 0);
       return {
         filesConverted: 0, conversions: 0, filesRemaining: this.dailyLimit,
-        resetTime: Math.floor(tomorrow.getTime() / 1000), date: this.getCurrentDate(), error: true
+        resetTime: this.getResetTime(), date: this.getCurrentDate(), error: true
       };
     }
   }
@@ -168,6 +168,14 @@ export const logError = (error, context = {}) => {
   });
 };
 
+/**
+ * Reports whether per-request progress logging is enabled via the `VERBOSE_LOGGING` variable.
+ * Warnings and errors are logged regardless.
+ * @param {object} env - The Cloudflare environment object.
+ * @returns {boolean} True if verbose logging is enabled.
+ */
+export const isVerboseLogging = (env) => env?.VERBOSE_LOGGING === true || env?.VERBOSE_LOGGING === 'true';
+
 /**
  * A handler for operations that can have partial failures, like batch file processing.
  * It tracks successes and failures separately.
@@ -5,10 +5,27 @@
  * is compliant and can be imported into Garmin Connect.
  */
 
+import { TAKEOUT_REQUIRED_FIELDS } from './security.js';
+
 // Lazily import the Garmin FIT SDK to handle potential ESM/CJS compatibility issues at build time.
 let MesgNum;
 let FitEncoder;
 
+// Week/year labels by input filename. Takeout filenames repeat across uploads,
+// so a small bounded cache avoids re-deriving the ISO week each time.
+const WEEK_YEAR_CACHE_SIZE = 256;
+const weekYearCache = new Map();
+// Takeout filenames look like 'weight-2023-12-31.json'; browsers may append ' (1)' to duplicates.
+const TAKEOUT_FILENAME_DATE = /^weight-(\d{4})-(\d{1,2})-(\d{1,2})\b/;
+
+// UTC midnight in milliseconds by Takeout date string. A weight log has many
+// entries per day, so each distinct date only needs to be parsed once.
+const DAY_EPOCH_CACHE_SIZE = 4096;
+const dayEpochCache = new Map();
+
+// Multiplying by the reciprocal is cheaper than dividing for every entry.
+const LB_TO_KG = 1 / 2.2046;
+
 /**
  * Ensures that the Garmin FIT SDK modules are loaded before use.
  * This is a one-time asynchronous operation.
@@ -26,6 +43,86 @@ async function ensureFitSdk() {
   }
 }
 
+/**
+ * Parses the decimal digits in `str` between `start` and `end` without allocating substrings.
+ * @param {string} str - The string to read from.
+ * @param {number} start - The index of the first digit.
+ * @param {number} end - The index just past the last digit.
+ * @returns {number} The parsed integer, or -1 if any character is not a digit.
+ */
+function parseDigits(str, start, end) {
+  let value = 0;
+  for (let i = start; i < end; i++) {
+    const digit = str.charCodeAt(i) - 48;
+    if (digit < 0 || digit > 9) return -1;
+    value = value * 10 + digit;
+  }
+  return value;
+}
+
+/**
+ * Returns the number of days from 1970-01-01 to a proleptic Gregorian date.
+ * Months outside 1-12 and days outside the month roll over into neighbouring months and years.
+ * Unlike `Date.UTC`, years 0-99 are taken literally rather than mapped to 1900-1999.
+ * @param {number} year - The full year.
+ * @param {number} month - The month (1-12).
+ * @param {number} day - The day of the month.
+ * @returns {number} Whole days since the Unix epoch.
+ */
+function daysFromCivil(year, month, day) {
+  const yearCarry = Math.floor((month - 1) / 12);
+  const m = month - yearCarry * 12;
+  // Count years from March so the leap day falls at the end of the year.
+  const y = year + yearCarry - (m <= 2 ? 1 : 0);
+  const era = Math.floor(y / 400);
+  const yoe = y - era * 400;
+  const doy = Math.floor((153 * (m > 2 ? m - 3 : m + 9) + 2) / 5);
+  const doe = yoe * 365 + Math.floor(yoe / 4) - Math.floor(yoe / 100) + doy;
+  return era * 146097 + doe - 719468 + (day - 1);
+}
+
+/**
+ * Returns the proleptic Gregorian year containing a day count since 1970-01-01.
+ * @param {number} days - Whole days since the Unix epoch.
+ * @returns {number} The calendar year.
+ */
+function civilYearFromDays(days) {
+  const z = days + 719468;
+  const era = Math.floor(z / 146097);
+  const doe = z - era * 146097;
+  const yoe = Math.floor((doe - Math.floor(doe / 1460) + Math.floor(doe / 36524) - Math.floor(doe / 146096)) / 365);
+  const doy = doe - (365 * yoe + Math.floor(yoe / 4) - Math.floor(yoe / 100));
+  const mp = Math.floor((5 * doy + 2) / 153);
+  // The computed year starts in March, so January and February belong to the next one.
+  return yoe + era * 400 + (mp >= 10 ? 1 : 0);
+}
+
+/**
+ * Returns UTC midnight for a fixed-layout MM/DD/YY or MM/DD/YYYY date string, memoized per string.
+ * @param {string} date - The date string, already checked for the fixed layout.
+ * @returns {number} The day's epoch in milliseconds, or NaN if the string contains non-digits.
+ */
+function getDayEpochMs(date) {
+  let dayMs = dayEpochCache.get(date);
+  if (dayMs !== undefined) return dayMs;
+
+  const month = parseDigits(date, 0, 2);
+  const day = parseDigits(date, 3, 5);
+  let year = parseDigits(date, 6, date.length);
+  if ((month | day | year) < 0) {
+    dayMs = NaN;
+  } else {
+    if (date.length === 8) year += 2000;
+    dayMs = Date.UTC(year, month - 1, day);
+  }
+
+  if (dayEpochCache.size >= DAY_EPOCH_CACHE_SIZE) {
+    dayEpochCache.delete(dayEpochCache.keys().next().value);
+  }
+  dayEpochCache.set(date, dayMs);
+  return dayMs;
+}
+
 /**
  * A class to handle the conversion of Fitbit data to FIT format.
  */
@@ -43,15 +140,24 @@ class FitbitConverter {
     if (!Array.isArray(data) || data.length === 0) {
       return { unit: 'lbs', confidence: 'unknown', reason: 'No data available' };
     }
-    const weights = data.map(entry => entry.weight).filter(w => typeof w === 'number' && w > 0);
-    if (weights.length === 0) {
+    let count = 0;
+    let total = 0;
+    let minWeight = Infinity;
+    let maxWeight = -Infinity;
+    for (const entry of data) {
+      const w = entry.weight;
+      if (typeof w !== 'number' || !(w > 0)) continue;
+      count++;
+      total += w;
+      if (w < minWeight) minWeight = w;
+      if (w > maxWeight) maxWeight = w;
+    }
+    if (count === 0) {
       return { unit: 'lbs', confidence: 'unknown', reason: 'No valid weight values' };
     }
 
-    const avgWeight = weights.reduce((sum, w) => sum + w, 0) / weights.length;
-    const minWeight = Math.min(...weights);
-    const maxWeight = Math.max(...weights);
-    const stats = { min: minWeight, max: maxWeight, avg: avgWeight, count: weights.length };
+    const avgWeight = total / count;
+    const stats = { min: minWeight, max: maxWeight, avg: avgWeight, count };
 
     if (maxWeight < 200 && avgWeight < 150) {
       return { unit: 'kg', confidence: 'high', reason: `Average weight ${avgWeight.toFixed(1)}, max ${maxWeight.toFixed(1)} suggest kg`, stats };
@@ -65,62 +171,45 @@ class FitbitConverter {
     return { unit: 'lbs', confidence: 'low', reason: `Unclear pattern (avg ${avgWeight.toFixed(1)}), defaulting to lbs`, stats };
   }
 
-  /**
-   * Converts a weight value from pounds to kilograms.
-   * @param {number} pounds - The weight in pounds.
-   * @returns {number} The weight in kilograms, rounded to one decimal place.
-   */
-  convertPoundsToKg(pounds) {
-    return Math.round((pounds / 2.2046) * 10) / 10;
-  }
-
-  /**
-   * Normalizes a weight value to kilograms based on the detected unit.
-   * @param {number} weight - The weight value.
-   * @param {'kg'|'lbs'} detectedUnit - The detected unit of the weight.
-   * @returns {number} The weight in kilograms.
-   */
-  normalizeWeightToKg(weight, detectedUnit) {
-    if (detectedUnit === 'kg') {
-      return Math.round(weight * 10) / 10;
-    }
-    return this.convertPoundsToKg(weight);
-  }
-
   /**
    * Extracts the year and ISO week number from a Google Takeout filename (e.g., 'weight-2023-12-31.json').
    * @param {string} filename - The input filename.
    * @returns {string|null} The week and year string (e.g., '52-2023') or null if not found.
    */
   extractWeekYearFromFilename(filename) {
-    try {
-      const baseName = filename.replace('.json', '');
-      const parts = baseName.split('-');
-      if (parts.length >= 4 && parts[0] === 'weight') {
-        const year = parseInt(parts[1]);
-        const month = parseInt(parts[2]);
-        const day = parseInt(parts[3]);
-        const date = new Date(year, month - 1, day);
-        const weekNumber = this.getISOWeekNumber(date);
-        return `${weekNumber}-${year}`;
-      }
-    } catch (error) {
-      console.warn('Could not extract date from filename:', filename);
+    if (weekYearCache.has(filename)) return weekYearCache.get(filename);
+
+    let weekYear = null;
+    const match = TAKEOUT_FILENAME_DATE.exec(filename);
+    if (match) {
+      const year = Number(match[1]);
+      const weekNumber = this.getISOWeekNumber(year, Number(match[2]), Number(match[3]));
+      weekYear = `${weekNumber}-${year}`;
+    }
+
+    if (weekYearCache.size >= WEEK_YEAR_CACHE_SIZE) {
+      weekYearCache.delete(weekYearCache.keys().next().value);
     }
-    return null;
+    weekYearCache.set(filename, weekYear);
+    return weekYear;
   }
 
   /**
-   * Calculates the ISO 8601 week number for a given date.
-   * @param {Date} date - The date object.
+   * Calculates the ISO 8601 week number for a calendar date using day arithmetic only.
+   * Out-of-range months and days roll over into neighbouring months and years.
+   * @param {number} year - The full year; years below 100 are taken literally.
+   * @param {number} month - The month (1-12).
+   * @param {number} day - The day of the month.
    * @returns {number} The ISO week number.
    */
-  getISOWeekNumber(date) {
-    const d = new Date(Date.UTC(date.getFullYear(), date.getMonth(), date.getDate()));
-    const dayNum = d.getUTCDay() || 7;
-    d.setUTCDate(d.getUTCDate() + 4 - dayNum);
-    const yearStart = new Date(Date.UTC(d.getUTCFullYear(), 0, 1));
-    return Math.ceil((((d - yearStart) / 86400000) + 1) / 7);
+  getISOWeekNumber(year, month, day) {
+    const days = daysFromCivil(year, month, day);
+    // 1970-01-01 was a Thursday; ISO weekdays run Monday = 1 to Sunday = 7.
+    const dayNum = ((((days + 3) % 7) + 7) % 7) + 1;
+    // The ISO week belongs to the year that contains its Thursday.
+    const thursday = days + 4 - dayNum;
+    const yearStart = daysFromCivil(civilYearFromDays(thursday), 1, 1);
+    return Math.floor((thursday - yearStart) / 7) + 1;
   }
 
   /**
@@ -131,53 +220,93 @@ class FitbitConverter {
   validateGoogleTakeoutFormat(data) {
     if (!Array.isArray(data) || data.length === 0) return false;
     const firstEntry = data[0];
-    const requiredFields = ['logId', 'weight', 'date', 'time'];
-    return requiredFields.every(field => field in firstEntry);
+    for (const field of TAKEOUT_REQUIRED_FIELDS) {
+      if (!(field in firstEntry)) return false;
+    }
+    return true;
+  }
+
+  /**
+   * Extracts the timestamp, scaled weight and body fat of every entry into typed columns.
+   * This is the per-entry hot loop; it is kept in a small synchronous method so the
+   * engine can optimize it on its own instead of as part of the async caller.
+   * @param {Array<object>} jsonData - The array of weight entries.
+   * @param {'kg'|'lbs'} detectedUnit - The detected unit of the weights.
+   * @returns {{timestamps: Float64Array, weights: Float64Array, fats: Float64Array, sorted: boolean}} Columns indexed like `jsonData`,
+   * with weights in FIT scale (kg × 100), body fat rounded to 0.1 % (NaN when absent), and whether the timestamps are
+   * already in non-decreasing order.
+   */
+  extractWeightColumns(jsonData, detectedUnit) {
+    const count = jsonData.length;
+    const timestamps = new Float64Array(count);
+    const weights = new Float64Array(count);
+    const fats = new Float64Array(count);
+    // Weights are converted to kg, rounded to 0.1 kg, then scaled by 100 for the FIT weight field.
+    const kgFactor = detectedUnit === 'kg' ? 1 : LB_TO_KG;
+    let sorted = true;
+    let prevTs = -Infinity;
+    for (let i = 0; i < count; i++) {
+      const entry = jsonData[i];
+      const ts = this.getUnixMs(entry);
+      if (ts < prevTs) sorted = false;
+      prevTs = ts;
+      timestamps[i] = ts;
+      weights[i] = Math.round(entry.weight * kgFactor * 10) * 10;
+      fats[i] = entry.fat ? Math.round(entry.fat * 10) / 10 : NaN;
+    }
+    return { timestamps, weights, fats, sorted };
   }
 
   /**
    * Processes a single JSON file's data and converts it into a FIT file's byte array.
    * @param {Array<object>} jsonData - The array of weight entries.
    * @param {string} filename - The original filename, used for logging and naming.
+   * @param {boolean} [verbose=false] - Whether to log the unit detection result.
    * @returns {Promise<object>} An object containing the FIT file bytes, entry count, new filename, and unit detection details.
    */
-  async processJsonData(jsonData, filename) {
+  async processJsonData(jsonData, filename, verbose = false) {
     await ensureFitSdk();
     if (!this.validateGoogleTakeoutFormat(jsonData)) {
       throw new Error('Invalid Google Takeout format. Expected weight data with logId, weight, date, time fields.');
     }
 
     const unitDetection = this.detectWeightUnit(jsonData);
-    console.log(`Unit detection for ${filename}:`, unitDetection);
+    if (verbose) console.log(`Unit detection for ${filename}:`, unitDetection);
     if (unitDetection.confidence === 'low' || unitDetection.confidence === 'medium') {
       console.warn(`⚠️ ${unitDetection.reason}. If weights appear incorrect, your Fitbit data may be in a different unit than expected.`);
     }
 
+    const { timestamps, weights, fats, sorted } = this.extractWeightColumns(jsonData, unitDetection.unit);
+
+    // The first entry's timestamp is already in the column; no need to parse it again.
     const encoder = new FitEncoder();
-    const firstTsMs = this.getUnixMs(jsonData[0]);
     encoder.writeMesg({
       mesgNum: MesgNum.FILE_ID, type: 4, manufacturer: 255, product: 1,
-      serialNumber: 1701, number: 0, timeCreated: new Date(firstTsMs), productName: "Health Sync"
+      serialNumber: 1701, number: 0, timeCreated: new Date(timestamps[0]), productName: "Health Sync"
     });
 
-    const weightEntries = [];
-    for (const entry of jsonData) {
-      const tsMs = this.getUnixMs(entry);
-      const weightKg = this.normalizeWeightToKg(entry.weight, unitDetection.unit);
-      let bodyFat = entry.fat || 0.0;
-      bodyFat = (bodyFat === 0.0) ? null : Math.round(bodyFat * 10) / 10;
-      const weightScaled = Math.round(weightKg * 100);
-
-      weightEntries.push({
-        mesgNum: MesgNum.WEIGHT_SCALE, timestamp: new Date(tsMs), weight: weightScaled,
-        boneMass: 0.0, muscleMass: 0.0, percentHydration: 0.0,
-        ...(bodyFat !== null ? { percentFat: bodyFat } : {})
-      });
+    // Sort an index array by timestamp so message objects are only built once, in output order.
+    const count = timestamps.length;
+    const order = new Uint32Array(count);
+    for (let i = 0; i < count; i++) order[i] = i;
+    // Takeout exports are normally already in time order; only sort when they are not.
+    if (!sorted) {
+      order.sort((a, b) => (timestamps[a] - timestamps[b]) || (a - b));
     }
 
-    weightEntries.sort((a, b) => a.timestamp - b.timestamp);
-    for (const weightMsg of weightEntries) {
-      encoder.writeMesg(weightMsg);
+    // Resolve the SDK constant once and index the order array directly instead of iterating it.
+    const weightScaleMesgNum = MesgNum.WEIGHT_SCALE;
+    for (let k = 0; k < count; k++) {
+      const i = order[k];
+      const fat = fats[i];
+      // Build each message as one literal and add the optional field in place,
+      // rather than spreading a throwaway object per entry.
+      const mesg = {
+        mesgNum: weightScaleMesgNum, timestamp: new Date(timestamps[i]), weight: weights[i],
+        boneMass: 0.0, muscleMass: 0.0, percentHydration: 0.0
+      };
+      if (!Number.isNaN(fat)) mesg.percentFat = fat;
+      encoder.writeMesg(mesg);
     }
 
     const fitBytes = encoder.close();
@@ -185,7 +314,7 @@ class FitbitConverter {
 
     return {
       fitBytes,
-      entryCount: weightEntries.length,
+      entryCount: count,
       filename: this.getOutputFilename(filename),
       unitDetection: {
         detectedUnit: unitDetection.unit,
@@ -208,12 +337,25 @@ class FitbitConverter {
     }
     try {
       const { date, time } = entry;
+
+      // Fast path for the fixed Takeout layout: MM/DD/YY or MM/DD/YYYY and HH:MM:SS.
+      if ((date.length === 8 || date.length === 10) && date[2] === '/' && date[5] === '/' &&
+          time && time.length === 8 && time[2] === ':' && time[5] === ':') {
+        const hh = parseDigits(time, 0, 2);
+        const mm = parseDigits(time, 3, 5);
+        const ss = parseDigits(time, 6, 8);
+        if ((hh | mm | ss) >= 0) {
+          const dayMs = getDayEpochMs(date);
+          if (!Number.isNaN(dayMs)) return dayMs + hh * 3600000 + mm * 60000 + ss * 1000;
+        }
+      }
+
       const parts = date.split('/');
       const year = parts[2].length === 2 ? Number('20' + parts[2]) : Number(parts[2]);
       const month = Number(parts[0]);
       const day = Number(parts[1]);
       const [hh, mm, ss] = (time || '00:00:00').split(':').map(Number);
-      return new Date(Date.UTC(year, month - 1, day, hh, mm, ss)).getTime();
+      return Date.UTC(year, month - 1, day, hh, mm, ss);
     } catch {
       return Date.now();
     }
@@ -230,23 +372,31 @@ class FitbitConverter {
   }
 }
 
+// The converter holds no per-request state beyond a running counter, so one
+// instance is shared by every conversion in the isolate.
+const converter = new FitbitConverter();
+
 /**
  * Converts an array of Fitbit JSON file data into an array of Garmin FIT files.
  * @param {Array<[string, Array<object>]>} jsonFiles - An array of tuples, where each tuple contains a filename and its parsed JSON data.
- * @returns {Promise<Array<[string, Uint8Array, object]>>} A promise that resolves to an array of tuples,
- * each containing the new filename, the FIT file as a Uint8Array, and the unit detection info.
+ * @param {object} [options] - Conversion options.
+ * @param {boolean} [options.verbose=false] - Whether to log per-file progress.
+ * @returns {Promise<Array<[string, Uint8Array, object, number]>>} A promise that resolves to an array of tuples,
+ * each containing the new filename, the FIT file as a Uint8Array, the unit detection info, and the number of
+ * weight entries written.
  */
-async function convertFitbitToGarmin(jsonFiles) {
-  const converter = new FitbitConverter();
+async function convertFitbitToGarmin(jsonFiles, { verbose = false } = {}) {
   const results = [];
 
   for (const [filename, jsonData] of jsonFiles) {
     try {
-      const result = await converter.processJsonData(jsonData, filename);
-      results.push([result.filename, result.fitBytes, result.unitDetection]);
-      console.log(`Converted ${filename}: ${result.entryCount} weight entries → ${result.filename}`);
-      console.log(`  Unit detected: ${result.unitDetection.detectedUnit} (${result.unitDetection.confidence} confidence)`);
-      console.log(`  Reason: ${result.unitDetection.reason}`);
+      const result = await converter.processJsonData(jsonData, filename, verbose);
+      results.push([result.filename, result.fitBytes, result.unitDetection, result.entryCount]);
+      if (verbose) {
+        console.log(`Converted ${filename}: ${result.entryCount} weight entries → ${result.filename}`);
+        console.log(`  Unit detected: ${result.unitDetection.detectedUnit} (${result.unitDetection.confidence} confidence)`);
+        console.log(`  Reason: ${result.unitDetection.reason}`);
+      }
     } catch (error) {
       console.error(`Failed to convert ${filename}: ${error.message}`);
       throw error;
@@ -5,7 +5,7 @@
  * pattern and falls back to less-dependent or in-memory solutions.
  */
 
-import { AppError } from './error-handler.js';
+import { AppError, isVerboseLogging } from './error-handler.js';
 
 /**
  * Manages the health of backend components and provides fallback mechanisms.
@@ -17,6 +17,8 @@ export class IntelligentFallback {
    */
   constructor(env) {
     this.env = env;
+    /** @type {boolean} - Whether to log the strategy chosen for every rate limit check. */
+    this.verboseLogging = isVerboseLogging(env);
     /** @type {object} - The health status of each backend component. */
     this.healthStatus = {
       d1: { status: 'healthy', lastCheck: 0, failures: 0 },
@@ -46,6 +48,7 @@ export class IntelligentFallback {
       cleanupInterval: 300000, // 5 minutes
       entryTtl: 900000 // 15 minutes
     };
+    this.lastMemoryCleanup = Date.now();
   }
 
   /**
@@ -194,13 +197,22 @@ export class IntelligentFallback {
     const key = `${clientId}:${endpoint}`;
     const now = Math.floor(Date.now() / 1000);
     const windowStart = now - config.window;
+    // The store lives for the isolate, so prune it here rather than relying on performMaintenance.
+    if (Date.now() - this.lastMemoryCleanup > this.memoryConfig.cleanupInterval ||
+        this.memoryStore.size > this.memoryConfig.maxEntries) {
+      this.cleanupMemoryStore();
+    }
+
     let bucket = this.memoryStore.get(key);
     if (!bucket) {
-      bucket = { requests: [], lastUpdate: now };
+      bucket = { requests: [], lastUpdate: now, window: config.window };
       this.memoryStore.set(key, bucket);
     }
 
-    bucket.requests = bucket.requests.filter(timestamp => timestamp > windowStart);
+    // Timestamps are appended in order, so expired ones are always at the front.
+    let expired = 0;
+    while (expired < bucket.requests.length && bucket.requests[expired] <= windowStart) expired++;
+    if (expired > 0) bucket.requests.splice(0, expired);
 
     if (bucket.requests.length >= config.max) {
       const resetTime = bucket.requests[0] + config.window;
@@ -212,6 +224,7 @@ export class IntelligentFallback {
 
     bucket.requests.push(now);
     bucket.lastUpdate = now;
+    bucket.window = config.window;
     return { rateLimited: false, current: bucket.requests.length, max: config.max, source: 'memory-fallback' };
   }
 
@@ -269,7 +282,9 @@ export class IntelligentFallback {
     await this.checkHealth();
     const { strategy, components } = this.getAvailableComponents();
     const config = this.getConfig(endpoint);
-    console.log(`Rate limit strategy: ${strategy}, endpoint: ${endpoint}, client: ${clientId}`);
+    if (this.verboseLogging) {
+      console.log(`Rate limit strategy: ${strategy}, endpoint: ${endpoint}, client: ${clientId}`);
+    }
 
     try {
       switch (strategy) {
@@ -312,21 +327,26 @@ export class IntelligentFallback {
 
   /**
    * Cleans up the in-memory store by removing expired or excess entries.
+   * A bucket only expires once its newest request is older than its rate limit window.
    * @returns {{removedExpired: number, currentSize: number}} The result of the cleanup operation.
    */
   cleanupMemoryStore() {
     const now = Date.now();
+    this.lastMemoryCleanup = now;
     const expiredKeys = [];
     for (const [key, bucket] of this.memoryStore.entries()) {
-      if ((now / 1000) - bucket.lastUpdate > this.memoryConfig.entryTtl / 1000) {
+      const ttl = Math.max(this.memoryConfig.entryTtl / 1000, bucket.window || 0);
+      if ((now / 1000) - bucket.lastUpdate > ttl) {
         expiredKeys.push(key);
       }
     }
     expiredKeys.forEach(key => this.memoryStore.delete(key));
 
     if (this.memoryStore.size > this.memoryConfig.maxEntries) {
+      // Trim below the cap so a full store isn't re-sorted on every request.
+      const target = Math.floor(this.memoryConfig.maxEntries * 0.9);
       const entries = Array.from(this.memoryStore.entries()).sort((a, b) => a[1].lastUpdate - b[1].lastUpdate);
-      const toRemove = entries.slice(0, this.memoryStore.size - this.memoryConfig.maxEntries);
+      const toRemove = entries.slice(0, this.memoryStore.size - target);
       toRemove.forEach(([key]) => this.memoryStore.delete(key));
     }
     return { removedExpired: expiredKeys.length, currentSize: this.memoryStore.size };
@@ -30,9 +30,11 @@ export class MultiTierRateLimiter {
     };
     this.analyticsConfig = {
       batchSize: 100,
+      maxBuffered: 1000, // Oldest events are dropped beyond this while R2 is failing
       flushInterval: 60000, // 1 minute
       buffer: []
     };
+    this.lastFlushKeyTime = 0; // Millisecond used in the most recent analytics object key
   }
 
   /**
@@ -91,8 +93,8 @@ export class MultiTierRateLimiter {
         } : null
       });
 
-      // Tier 3: Queue for R2 analytics (async)
-      this.queueAnalytics(clientId, endpoint, result, metadata);
+      // Tier 3: Queue for R2 analytics, flushing within this request once a batch is full
+      await this.queueAnalytics(clientId, endpoint, result, metadata);
 
       return { ...result, source: 'd1' };
 
@@ -107,7 +109,7 @@ export class MultiTierRateLimiter {
           details: error.details
         });
 
-        this.queueAnalytics(clientId, endpoint, {
+        await this.queueAnalytics(clientId, endpoint, {
           rateLimited: true,
           ...error.details
         }, metadata);
@@ -277,10 +279,13 @@ export class MultiTierRateLimiter {
 
   /**
    * Queues an analytics event to an in-memory buffer to be flushed to R2.
+   * The buffer lives for the isolate, so the returned flush is awaited by the
+   * request that filled the batch rather than left running detached.
    * @param {string} clientId - The client identifier.
    * @param {string} endpoint - The endpoint of the request.
    * @param {object} result - The result of the rate limit check.
    * @param {object} metadata - Additional metadata about the request.
+   * @returns {Promise<void>|undefined} The flush, if this event filled a batch.
    * @private
    */
   queueAnalytics(clientId, endpoint, result, metadata) {
@@ -305,7 +310,7 @@ export class MultiTierRateLimiter {
 
       // Flush to R2 if buffer is full
       if (this.analyticsConfig.buffer.length >= this.analyticsConfig.batchSize) {
-        this.flushAnalytics();
+        return this.flushAnalytics();
       }
     } catch (error) {
       console.error('Analytics queue error:', error);
@@ -319,15 +324,22 @@ export class MultiTierRateLimiter {
   async flushAnalytics() {
     if (this.analyticsConfig.buffer.length === 0) return;
 
+    // Take ownership of the queued events before awaiting, so a concurrent flush
+    // cannot write them again and events queued during the put are kept.
+    const events = this.analyticsConfig.buffer;
+    this.analyticsConfig.buffer = [];
+
     try {
       const timestamp = new Date().toISOString().split('T')[0];
       const hour = new Date().getHours().toString().padStart(2, '0');
-      const key = `analytics/rate-limits/${timestamp}/${hour}/${Date.now()}.json`;
+      // Flushes can overlap, so never reuse a millisecond for the object key.
+      this.lastFlushKeyTime = Math.max(Date.now(), this.lastFlushKeyTime + 1);
+      const key = `analytics/rate-limits/${timestamp}/${hour}/${this.lastFlushKeyTime}.json`;
 
       const data = {
-        events: [...this.analyticsConfig.buffer],
+        events,
         metadata: {
-          count: this.analyticsConfig.buffer.length,
+          count: events.length,
           timestamp: new Date().toISOString()
         }
       };
@@ -343,13 +355,12 @@ export class MultiTierRateLimiter {
         }
       });
 
-      // Clear buffer
-      this.analyticsConfig.buffer = [];
-
       console.log(`Flushed ${data.events.length} analytics events to R2: ${key}`);
     } catch (error) {
       console.error('Failed to flush analytics to R2:', error);
-      // Don't clear buffer on error - retry next time
+      // Requeue ahead of newer events to retry next time, keeping the buffer bounded.
+      const requeued = events.concat(this.analyticsConfig.buffer);
+      this.analyticsConfig.buffer = requeued.slice(-this.analyticsConfig.maxBuffered);
     }
   }
 
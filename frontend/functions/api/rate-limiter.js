@@ -9,6 +9,7 @@ import { MultiTierRateLimiter } from './multi-tier-rate-limiter.js';
 import { IntelligentFallback } from './intelligent-fallback.js';
 import { PassManager } from './pass-manager.js';
 import { DailyLimitTracker } from './daily-limit-tracker.js';
+import { AppError, ERROR_CODES } from './error-handler.js';
 
 /**
  * @constant {object} RATE_LIMITS
@@ -20,6 +21,13 @@ const RATE_LIMITS = {
   files: { maxPerConversion: 3, maxSizeBytes: 10 * 1024 * 1024 } // 10MB
 };
 
+/**
+ * @constant {number} CLIENT_SLOT_TTL_MS
+ * @description How long an in-flight slot is honoured. A request cancelled mid-task never
+ * runs its cleanup, so older slots are treated as abandoned and reclaimed.
+ */
+const CLIENT_SLOT_TTL_MS = 2 * 60 * 1000;
+
 /**
  * The main RateLimiter class that orchestrates different rate limiting strategies.
  */
@@ -34,6 +42,41 @@ class RateLimiter {
     this.fallback = new IntelligentFallback(env);
     this.passManager = new PassManager(env);
     this.dailyLimitTracker = new DailyLimitTracker(env);
+    /** @type {Map<string, {startedAt: number}>} - The in-flight slot held by each client in this isolate. */
+    this.clientSlots = new Map();
+  }
+
+  /**
+   * Runs a task unless the same client already has one in flight in this isolate.
+   * Concurrent calls are rejected rather than queued, so nothing waits on another request's promise.
+   * @param {string} clientId - The client identifier.
+   * @param {Function} task - An async function to run while holding the client's slot.
+   * @returns {Promise<any>} The task's result.
+   * @throws {AppError} A 429 RATE_LIMIT_EXCEEDED error if the client already holds a live slot. Its
+   * details have the same shape as a `checkRateLimit` result, for use with `createRateLimitResponse`.
+   */
+  async withClientSlot(clientId, task) {
+    const now = Date.now();
+    const held = this.clientSlots.get(clientId);
+    if (held && now - held.startedAt < CLIENT_SLOT_TTL_MS) {
+      const releasedAt = held.startedAt + CLIENT_SLOT_TTL_MS;
+      throw new AppError(ERROR_CODES.RATE_LIMIT_EXCEEDED, {
+        rateLimited: true,
+        reason: 'A conversion is already in progress for this client',
+        resetTime: Math.ceil(releasedAt / 1000),
+        retryAfter: Math.ceil((releasedAt - now) / 1000)
+      }, 429);
+    }
+
+    const slot = { startedAt: now };
+    this.clientSlots.set(clientId, slot);
+    try {
+      return await task();
+    } finally {
+      if (this.clientSlots.get(clientId) === slot) {
+        this.clientSlots.delete(clientId);
+      }
+    }
   }
 
   /**
@@ -64,7 +107,6 @@ class RateLimiter {
 
     try {
       const endpoint = this.mapLegacyType(type);
-      const metadata = this.collectMetadata(request);
       await this.fallback.intelligentRateLimit(clientId, endpoint, this.multiTier);
       return null; // Allowed
     } catch (error) {
@@ -99,54 +141,6 @@ class RateLimiter {
     return mapping[type] || 'suspicious';
   }
 
-  /**
-   * Collects metadata from the request for logging and analysis.
-   * @param {Request} request - The incoming request.
-   * @returns {object} An object containing request metadata.
-   * @private
-   */
-  collectMetadata(request) {
-    return {
-      userAgent: request.headers.get('user-agent'),
-      country: request.cf?.country,
-      fingerprint: this.generateFingerprint(request),
-      timestamp: Date.now()
-    };
-  }
-
-  /**
-   * Generates a simple client fingerprint for more robust tracking.
-   * @param {Request} request - The incoming request.
-   * @returns {string} A hex-encoded hash representing the fingerprint.
-   * @private
-   */
-  generateFingerprint(request) {
-    const components = [
-      request.headers.get('user-agent') || '',
-      request.headers.get('accept-language') || '',
-      request.headers.get('accept-encoding') || '',
-      request.cf?.asn || '',
-      request.cf?.country || ''
-    ];
-    return this.simpleHash(components.join('|')).toString(16);
-  }
-
-  /**
-   * A simple, non-cryptographic hash function.
-   * @param {string} str - The string to hash.
-   * @returns {number} The hash result.
-   * @private
-   */
-  simpleHash(str) {
-    let hash = 0;
-    for (let i = 0; i < str.length; i++) {
-      const char = str.charCodeAt(i);
-      hash = ((hash << 5) - hash) + char;
-      hash &= hash; // Convert to 32-bit integer
-    }
-    return Math.abs(hash);
-  }
-
   /**
    * Placeholder for recording a successful operation, as the counter is now
    * incremented atomically during the check.
@@ -26,6 +26,25 @@ const SECURITY_CONFIG = {
   blockedIpCacheTtl: 3600, // 1 hour
 };
 
+/**
+ * @constant {ReadonlyArray<string>} TAKEOUT_REQUIRED_FIELDS
+ * @description Fields every Google Takeout weight entry must contain.
+ */
+const TAKEOUT_REQUIRED_FIELDS = Object.freeze(['logId', 'weight', 'date', 'time']);
+
+/**
+ * @constant {ReadonlyArray<RegExp>} DANGEROUS_FILENAME_PATTERNS
+ * @description Filename patterns rejected by `validateFilename`: path traversal, reserved
+ * characters, control characters and Windows device names. None use the `g` flag, so the
+ * shared instances carry no `lastIndex` state between calls.
+ */
+const DANGEROUS_FILENAME_PATTERNS = Object.freeze([
+  /\.\./,
+  /[<>:"|?*]/,
+  /[\x00-\x1f]/,
+  /^(CON|PRN|AUX|NUL|COM[1-9]|LPT[1-9])(\..*)?$/i
+]);
+
 /**
  * A class for performing various security validations on incoming requests.
  */
@@ -51,8 +70,7 @@ class SecurityValidator {
     if (filename.length > SECURITY_CONFIG.maxFilenameLength) {
       throw new AppError(ERROR_CODES.INVALID_FILE_TYPE, 'Filename too long', 400);
     }
-    const dangerousPatterns = [/\.\./, /[<>:"|?*]/, /[\x00-\x1f]/, /^(CON|PRN|AUX|NUL|COM[1-9]|LPT[1-9])(\..*)?$/i];
-    for (const pattern of dangerousPatterns) {
+    for (const pattern of DANGEROUS_FILENAME_PATTERNS) {
       if (pattern.test(filename)) {
         throw new AppError(ERROR_CODES.INVALID_FILE_TYPE, 'Invalid filename format', 400);
       }
@@ -125,8 +143,7 @@ class SecurityValidator {
     const firstEntry = data[0];
     if (!firstEntry || typeof firstEntry !== 'object') throw new AppError(ERROR_CODES.INVALID_TAKEOUT_FORMAT, `Invalid entry format in ${filename}`, 422);
 
-    const requiredFields = ['logId', 'weight', 'date', 'time'];
-    for (const field of requiredFields) {
+    for (const field of TAKEOUT_REQUIRED_FIELDS) {
       if (!(field in firstEntry)) throw new AppError(ERROR_CODES.INVALID_TAKEOUT_FORMAT, `Missing required field '${field}' in ${filename}`, 422);
     }
     for (let i = 0; i < Math.min(data.length, 10); i++) {
@@ -236,4 +253,4 @@ class SecurityValidator {
   }
 }
 
-export { SecurityValidator, SECURITY_CONFIG };
\ No newline at end of file
+export { SecurityValidator, SECURITY_CONFIG, TAKEOUT_REQUIRED_FIELDS };
\ No newline at end of file
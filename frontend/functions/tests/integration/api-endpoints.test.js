@@ -525,6 +525,72 @@ describe('API Endpoints Integration Tests', () => {
       expect(response.status).toBe(429);
       expect(response.headers.get('Retry-After')).toBeDefined();
     });
+
+    it('should return 429 for a second conversion while the first is in flight', async () => {
+      const createRequest = () => new Request('https://example.com/api/convert', {
+        method: 'POST',
+        headers: {
+          'Content-Type': 'application/json',
+          'cf-connecting-ip': '192.168.1.1'
+        },
+        body: JSON.stringify({ upload_id: 'test-upload-123' })
+      });
+
+      // Hold the first conversion on its upload metadata lookup
+      let releaseUpload;
+      const uploadLookup = new Promise(resolve => { releaseUpload = resolve; });
+      mockEnv.RATE_LIMITS.get.mockImplementation(async (key) =>
+        key.startsWith('upload:') ? uploadLookup : null);
+
+      const first = onRequest({ request: createRequest(), env: mockEnv, ctx: mockContext });
+      await vi.waitFor(() => {
+        expect(mockEnv.RATE_LIMITS.get).toHaveBeenCalledWith('upload:test-upload-123');
+      });
+
+      const second = await onRequest({ request: createRequest(), env: mockEnv, ctx: mockContext });
+
+      expect(second).toBeInstanceOf(Response);
+      expect(second.status).toBe(429);
+      expect(Number(second.headers.get('Retry-After'))).toBeGreaterThan(0);
+
+      releaseUpload(null);
+      const firstResponse = await first;
+      expect(firstResponse.status).toBe(404);
+    });
+
+    it('should give files from the same week distinct output names', async () => {
+      const files = [
+        { filename: 'weight-2023-12-31.json' },
+        { filename: 'weight-2023-12-31 (1).json' }
+      ];
+      mockEnv.RATE_LIMITS.get.mockImplementation(async (key) =>
+        key === 'upload:test-upload-123' ? JSON.stringify({ files }) : null);
+      mockEnv.FILE_STORAGE.get.mockImplementation(async () => ({
+        json: async () => [{ logId: 1, weight: 80.5, date: '12/31/23', time: '08:00:00' }]
+      }));
+
+      const request = new Request('https://example.com/api/convert', {
+        method: 'POST',
+        headers: {
+          'Content-Type': 'application/json',
+          'cf-connecting-ip': '192.168.1.1'
+        },
+        body: JSON.stringify({ upload_id: 'test-upload-123' })
+      });
+
+      const response = await onRequest({ request, env: mockEnv, ctx: mockContext });
+
+      expect(response.status).toBe(200);
+      const responseData = await response.json();
+      expect(responseData.download_urls.map(url => url.split('/').pop())).toEqual([
+        'Weight 52-2023 Fitbit.fit',
+        'Weight 52-2023 Fitbit (2).fit'
+      ]);
+      const storedKeys = mockEnv.FILE_STORAGE.put.mock.calls
+        .map(([key]) => key)
+        .filter(key => key.startsWith('converted/'));
+      expect(new Set(storedKeys).size).toBe(2);
+    });
   });
 
   describe('Download Endpoint', () => {
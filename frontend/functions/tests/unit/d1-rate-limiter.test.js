@@ -44,6 +44,7 @@ describe('D1RateLimiter Unit Tests', () => {
     rateLimiter = new D1RateLimiter(mockEnv);
     // Pre-load a default config for most tests
     rateLimiter.configs.set('uploads', { max: 20, window: 300, burst: 0, enabled: true });
+    rateLimiter.configLoadedAt = Date.now();
   });
 
   afterEach(() => {
@@ -93,6 +94,43 @@ describe('D1RateLimiter Unit Tests', () => {
       });
   });
 
+  describe('loadConfig', () => {
+    beforeEach(() => {
+      rateLimiter = new D1RateLimiter(mockEnv);
+    });
+
+    it('should reload the config once it is older than its TTL', async () => {
+      mockStatement.all.mockResolvedValueOnce({
+        results: [{ endpoint: 'uploads', max_requests: 20, window_size: 300, burst_allowance: 0, enabled: 1 }]
+      });
+      await rateLimiter.loadConfig();
+      await rateLimiter.loadConfig();
+      expect(mockStatement.all).toHaveBeenCalledTimes(1);
+
+      mockStatement.all.mockResolvedValueOnce({
+        results: [{ endpoint: 'uploads', max_requests: 5, window_size: 300, burst_allowance: 0, enabled: 1 }]
+      });
+      rateLimiter.configLoadedAt -= 10 * 60 * 1000;
+      await rateLimiter.loadConfig();
+
+      expect(mockStatement.all).toHaveBeenCalledTimes(2);
+      expect(rateLimiter.configs.get('uploads').max).toBe(5);
+    });
+
+    it('should use defaults after a failed load without caching them', async () => {
+      mockStatement.all.mockRejectedValueOnce(new Error('D1 unavailable'));
+      await rateLimiter.loadConfig();
+      expect(rateLimiter.configs.get('uploads').max).toBe(20);
+
+      mockStatement.all.mockResolvedValueOnce({
+        results: [{ endpoint: 'uploads', max_requests: 5, window_size: 300, burst_allowance: 0, enabled: 1 }]
+      });
+      await rateLimiter.loadConfig();
+
+      expect(rateLimiter.configs.get('uploads').max).toBe(5);
+    });
+  });
+
   describe('getViolationType', () => {
     it('should correctly classify violation types', () => {
       expect(rateLimiter.getViolationType(21, 20)).toBe('RATE_EXCEEDED');
@@ -94,4 +94,112 @@ describe('fit-converter weight encoding tests', () => {
     expect(weightMessage).toBeDefined();
     expect(weightMessage.weight).toBe(8870);
   });
+
+  it('writes weight messages in timestamp order', async () => {
+    const jsonData = [
+      { logId: 1710806400000, weight: 88.9, date: '03/19/24', time: '00:00:00' },
+      { logId: 1710720000000, weight: 88.7, date: '03/18/24', time: '00:00:00' },
+      { logId: 1710892800000, weight: 89.1, date: '03/20/24', time: '00:00:00' }
+    ];
+
+    await convertFitbitToGarmin([[
+      'weight-2024-03-18.json',
+      jsonData
+    ]]);
+
+    const weights = __getWrittenMessages()
+      .filter(msg => msg.mesgNum === 'WEIGHT_SCALE')
+      .map(msg => msg.weight);
+    expect(weights).toEqual([8870, 8890, 8910]);
+  });
+});
+
+describe('fit-converter date and time parsing', () => {
+  beforeEach(() => {
+    __resetMessages();
+  });
+
+  // A logId below 1e12 is not a millisecond timestamp, so the date and time fields are parsed instead.
+  const writtenTimestamps = async (entries) => {
+    await convertFitbitToGarmin([[
+      'weight-2024-03-18.json',
+      entries.map(([date, time], i) => ({ logId: i + 1, weight: 88.7, date, time }))
+    ]]);
+    return __getWrittenMessages()
+      .filter(msg => msg.mesgNum === 'WEIGHT_SCALE')
+      .map(msg => msg.timestamp.toISOString());
+  };
+
+  it('parses two- and four-digit years as UTC', async () => {
+    expect(await writtenTimestamps([
+      ['03/18/24', '06:30:15'],
+      ['03/18/2024', '18:05:00'],
+      ['12/31/23', '23:59:59']
+    ])).toEqual([
+      '2023-12-31T23:59:59.000Z',
+      '2024-03-18T06:30:15.000Z',
+      '2024-03-18T18:05:00.000Z'
+    ]);
+  });
+
+  it('rolls days past the end of the month into the next month', async () => {
+    expect(await writtenTimestamps([['02/30/24', '08:00:00']])).toEqual(['2024-03-01T08:00:00.000Z']);
+  });
+
+  it('uses midnight when the time is missing', async () => {
+    expect(await writtenTimestamps([['03/18/24', undefined]])).toEqual(['2024-03-18T00:00:00.000Z']);
+  });
+
+  it('falls back to the split parser for dates outside the fixed layout', async () => {
+    expect(await writtenTimestamps([
+      [' 3/18/24', '06:30:00'],
+      ['3/8/2024', '07:00:00']
+    ])).toEqual([
+      '2024-03-08T07:00:00.000Z',
+      '2024-03-18T06:30:00.000Z'
+    ]);
+  });
+});
+
+describe('fit-converter output filenames', () => {
+  const jsonData = [
+    { logId: 1710720000000, weight: 88.7, date: '03/18/24', time: '06:30:00' }
+  ];
+
+  const outputFilename = async (inputFilename) => {
+    const [[filename]] = await convertFitbitToGarmin([[inputFilename, jsonData]]);
+    return filename;
+  };
+
+  it('labels files with the ISO week across year boundaries and leap days', async () => {
+    const cases = {
+      'weight-2020-12-31.json': 'Weight 53-2020 Fitbit.fit',
+      'weight-2021-01-03.json': 'Weight 53-2021 Fitbit.fit',
+      'weight-2021-01-04.json': 'Weight 1-2021 Fitbit.fit',
+      'weight-2023-01-01.json': 'Weight 52-2023 Fitbit.fit',
+      'weight-2024-12-30.json': 'Weight 1-2024 Fitbit.fit',
+      'weight-2020-02-29.json': 'Weight 9-2020 Fitbit.fit',
+      'weight-2024-02-29.json': 'Weight 9-2024 Fitbit.fit'
+    };
+
+    for (const [input, expected] of Object.entries(cases)) {
+      expect(await outputFilename(input)).toBe(expected);
+    }
+  });
+
+  it('takes years below 100 literally', async () => {
+    expect(await outputFilename('weight-0099-12-31.json')).toBe('Weight 53-99 Fitbit.fit');
+    expect(await outputFilename('weight-0100-01-01.json')).toBe('Weight 53-100 Fitbit.fit');
+  });
+
+  it('accepts duplicate-download suffixes and single-digit months and days', async () => {
+    expect(await outputFilename('weight-2023-12-31 (1).json')).toBe('Weight 52-2023 Fitbit.fit');
+    expect(await outputFilename('weight-2024-3-5.json')).toBe('Weight 10-2024 Fitbit.fit');
+  });
+
+  it('uses a generic name when the filename carries no date', async () => {
+    expect(await outputFilename('export.json')).toBe('Weight Converted Fitbit.fit');
+    expect(await outputFilename('weight-latest.json')).toBe('Weight Converted Fitbit.fit');
+    expect(await outputFilename('weight-2024-03-18abc.json')).toBe('Weight Converted Fitbit.fit');
+  });
 });
@@ -193,6 +193,38 @@ describe('IntelligentFallback Unit Tests', () => {
 
       Date.now = originalNow;
     });
+
+    it('should prune idle clients from the store once the cleanup interval passes', async () => {
+      const config = { max: 5, window: 300 };
+      await fallback.memoryRateLimit('idle-client', 'uploads', config);
+
+      const originalNow = Date.now;
+      Date.now = vi.fn().mockReturnValue(originalNow() + fallback.memoryConfig.entryTtl + 1000);
+
+      await fallback.memoryRateLimit('active-client', 'uploads', config);
+
+      expect(fallback.memoryStore.has('idle-client:uploads')).toBe(false);
+      expect(fallback.memoryStore.has('active-client:uploads')).toBe(true);
+
+      Date.now = originalNow;
+    });
+
+    it('should keep a bucket through cleanup while it is still inside its window', async () => {
+      const config = { max: 10, window: 3600 };
+      for (let i = 0; i < 10; i++) {
+        await fallback.memoryRateLimit('client1', 'conversions', config);
+      }
+
+      // Idle for longer than entryTtl but well inside the one hour conversions window
+      const originalNow = Date.now;
+      Date.now = vi.fn().mockReturnValue(originalNow() + 16 * 60 * 1000);
+
+      await expect(fallback.memoryRateLimit('client1', 'conversions', config)).rejects.toThrow(AppError);
+      expect(fallback.lastMemoryCleanup).toBe(Date.now());
+      expect(fallback.memoryStore.get('client1:conversions').requests).toHaveLength(10);
+
+      Date.now = originalNow;
+    });
   });
 
   describe('KV-Only Rate Limiting', () => {
@@ -276,6 +276,24 @@ describe('MultiTierRateLimiter Unit Tests', () => {
         expect.any(Object)
       );
     });
+
+    it('should keep events queued while a flush is in flight and not write them twice', async () => {
+      let finishPut;
+      mockR2.put.mockImplementationOnce(() => new Promise(resolve => { finishPut = resolve; }));
+      mockR2.put.mockResolvedValue();
+      multiTierLimiter.analyticsConfig.buffer.push({ event: 'first' });
+
+      const firstFlush = multiTierLimiter.flushAnalytics();
+      multiTierLimiter.analyticsConfig.buffer.push({ event: 'second' });
+      await multiTierLimiter.flushAnalytics();
+      finishPut();
+      await firstFlush;
+
+      expect(mockR2.put).toHaveBeenCalledTimes(2);
+      expect(JSON.parse(mockR2.put.mock.calls[0][1]).events).toEqual([{ event: 'first' }]);
+      expect(JSON.parse(mockR2.put.mock.calls[1][1]).events).toEqual([{ event: 'second' }]);
+      expect(multiTierLimiter.analyticsConfig.buffer).toHaveLength(0);
+    });
   });
 
   describe('Analytics Retrieval', () => {
@@ -4,7 +4,7 @@
  * client ID extraction, file validation, and the creation of rate limit responses.
  * It mocks the underlying multi-tier and fallback systems to focus on the top-level orchestration.
  */
-import { describe, it, expect, beforeEach, vi } from 'vitest';
+import { describe, it, expect, beforeEach, afterEach, vi } from 'vitest';
 import { RateLimiter } from '../../api/rate-limiter.js';
 
 describe('RateLimiter Unit Tests', () => {
@@ -360,6 +360,49 @@ describe('RateLimiter Unit Tests', () => {
     });
   });
 
+  describe('withClientSlot', () => {
+    afterEach(() => {
+      vi.useRealTimers();
+    });
+
+    it('should reject a concurrent task for the same client instead of queueing it', async () => {
+      let release;
+      const first = rateLimiter.withClientSlot('192.168.1.1', () => new Promise(resolve => { release = resolve; }));
+      const second = rateLimiter.withClientSlot('192.168.1.1', async () => 'second');
+
+      await expect(second).rejects.toMatchObject({ code: 'RATE_LIMIT_EXCEEDED', httpStatus: 429 });
+
+      release('first');
+      await expect(first).resolves.toBe('first');
+      expect(rateLimiter.clientSlots.size).toBe(0);
+    });
+
+    it('should not block other clients or later tasks after a failure', async () => {
+      const failing = rateLimiter.withClientSlot('192.168.1.1', async () => {
+        throw new Error('boom');
+      });
+      const other = rateLimiter.withClientSlot('192.168.1.2', async () => 'other');
+
+      await expect(failing).rejects.toThrow('boom');
+      await expect(other).resolves.toBe('other');
+      await expect(rateLimiter.withClientSlot('192.168.1.1', async () => 'next')).resolves.toBe('next');
+    });
+
+    it('should reclaim the slot of a task that never settles', async () => {
+      vi.useFakeTimers();
+      vi.setSystemTime(new Date('2024-03-18T06:00:00Z'));
+
+      // Simulates a request cancelled mid-conversion: its task never settles and its cleanup never runs.
+      rateLimiter.withClientSlot('192.168.1.1', () => new Promise(() => {}));
+      await expect(rateLimiter.withClientSlot('192.168.1.1', async () => 'blocked'))
+        .rejects.toMatchObject({ code: 'RATE_LIMIT_EXCEEDED' });
+
+      vi.setSystemTime(new Date('2024-03-18T06:05:00Z'));
+      await expect(rateLimiter.withClientSlot('192.168.1.1', async () => 'reclaimed')).resolves.toBe('reclaimed');
+      expect(rateLimiter.clientSlots.size).toBe(0);
+    });
+  });
+
   describe('Rate Limiting Stress Tests', () => {
     it('should handle concurrent requests correctly', async () => {
       const now = Math.floor(Date.now() / 1000);